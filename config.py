@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent
@@ -7,4 +8,11 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 DEFAULT_LANGUAGES = ['ru', 'en']
 SUPPORTED_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp', '.gif']
 USE_LANGUAGE_TOOL = False
+# Адрес запущенного сервера LanguageTool (например, http://localhost:8081), None - локальная JVM
+LANGUAGE_TOOL_SERVER = os.environ.get('LANGUAGE_TOOL_SERVER')
+# Частотный словарь для проверки орфографии ("слово частота" в каждой строке), None - без орфографии
+SPELL_DICTIONARY_PATH = os.environ.get('SPELL_DICTIONARY_PATH')
+# Пакетная проверка ошибок в режиме папки: группа закрывается по числу страниц или символов
+CHECK_BATCH_PAGES = 10
+CHECK_BATCH_CHARS = 20000
 LOG_LEVEL = 'INFO'
\ No newline at end of file
@@ -1,38 +1,111 @@
+import atexit
+import bisect
+import copy
+import hashlib
 import logging
+import threading
+from collections import Counter, OrderedDict
 from typing import Dict, List
 import re
 
 logger = logging.getLogger(__name__)
 
+# Сколько результатов check_text хранить в кэше
+RESULT_CACHE_SIZE = 128
+
+# Разделитель текстов при пакетной проверке грамматики
+GRAMMAR_BATCH_DELIMITER = '\n\n§§§\n\n'
+# Максимальный размер одного запроса к LanguageTool (серверы ограничивают длину текста)
+GRAMMAR_BATCH_MAX_CHARS = 20000
+
+# Общие словари SymSpell: (язык, путь к словарю) -> SymSpell
+_spell_cache = {}
+_spell_cache_lock = threading.Lock()
+
+
+def _get_spell(language: str, dictionary_path: str):
+    """
+    Получить общий словарь SymSpell, построив его при первом обращении.
+    Частотный словарь: "слово частота" в каждой строке, со словоформами
+    """
+    key = (language, dictionary_path)
+    spell = _spell_cache.get(key)
+    if spell is None:
+        with _spell_cache_lock:
+            spell = _spell_cache.get(key)
+            if spell is None:
+                from symspellpy import SymSpell
+                spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+                if not spell.load_dictionary(dictionary_path, term_index=0, count_index=1, encoding='utf-8'):
+                    raise FileNotFoundError(dictionary_path)
+                _spell_cache[key] = spell
+    return spell
+
+
+# Общие экземпляры LanguageTool: (язык, сервер) -> LanguageTool.
+# JVM (или подключение к серверу) создается один раз на процесс
+_language_tools = {}
+_language_tools_lock = threading.Lock()
+
+
+def _get_language_tool(language: str, remote_server: str = None):
+    """Получить общий экземпляр LanguageTool, создав его при первом обращении"""
+    key = (language, remote_server)
+    tool = _language_tools.get(key)
+    if tool is None:
+        with _language_tools_lock:
+            tool = _language_tools.get(key)
+            if tool is None:
+                from language_tool_python import LanguageTool
+                tool = LanguageTool(language, remote_server=remote_server)
+                _language_tools[key] = tool
+    return tool
+
+
+@atexit.register
+def _close_language_tools():
+    """Остановить общие экземпляры LanguageTool при выходе"""
+    with _language_tools_lock:
+        for tool in _language_tools.values():
+            try:
+                tool.close()
+            except Exception as e:
+                logger.debug(f"Ошибка при закрытии LanguageTool: {e}")
+        _language_tools.clear()
+
+
+class _NonCyrillicMask(dict):
+    """
+    Таблица для str.translate: не кириллические символы -> пробел.
+    Заполняется по мере встречи символов вместо всех 0x110000 кодов
+    """
+
+    def __missing__(self, code: int) -> int:
+        char = chr(code)
+        value = code if ('а' <= char <= 'я' or 'А' <= char <= 'Я' or char in 'ёЁ') else ord(' ')
+        self[code] = value
+        return value
+
 
 class ErrorChecker:
     """Проверка и исправление ошибок OCR и орфографии"""
 
-    def __init__(self, language='ru'):
+    def __init__(self, language='ru', dictionary_path=None, language_tool_server=None):
         self.language = language
         logger.info(f"ErrorChecker инициализирован для языка: {language}")
 
-        # Пытаемся загрузить спеллчекер
-        try:
-            from pyspellchecker import SpellChecker
-            self.spell = SpellChecker(language=language)
-            self.has_spellchecker = True
-            logger.info("✓ pyspellchecker загружен")
-        except Exception as e:
-            logger.warning(f"pyspellchecker ошибка: {e}")
-            self.has_spellchecker = False
-            self.spell = None
+        # Спеллчекер и LanguageTool (запуск JVM) загружаются при первом обращении.
+        # Флаги оптимистичны и сбрасываются, если загрузка не удалась.
+        # Без частотного словаря (dictionary_path) орфография не проверяется
+        self.dictionary_path = dictionary_path
+        self.language_tool_server = language_tool_server
+        self._spell = None
+        self._lt = None
+        self.has_spellchecker = bool(dictionary_path)
+        self.has_language_tool = True
 
-        # Пытаемся загрузить LanguageTool для грамматики
-        try:
-            from language_tool_python import LanguageTool
-            self.lt = LanguageTool('ru')
-            self.has_language_tool = True
-            logger.info("✓ LanguageTool загружен")
-        except Exception as e:
-            logger.warning(f"LanguageTool ошибка: {e}")
-            self.has_language_tool = False
-            self.lt = None
+        # LRU-кэш результатов проверки: хэш текста и флагов -> результат
+        self._result_cache = OrderedDict()
 
         # Словарь частых контекстных ошибок
         self.context_errors = {
@@ -45,59 +118,199 @@ class ErrorChecker:
             'кнам': 'к нам'
         }
 
+        # Типичные замены символов при OCR
+        self._ocr_table = str.maketrans({
+            '0': 'О',
+            '1': 'І',
+            '3': 'З',
+            'l': 'і',
+        })
+
+        # Регулярные выражения компилируются один раз на экземпляр
+        self._hyphen_re = re.compile(r'([а-яёА-ЯЁ])-\n([а-яёА-ЯЁ])')
+        self._ocr_find = re.compile('[' + re.escape(''.join(map(chr, self._ocr_table))) + ']')
+        self._non_cyr_table = _NonCyrillicMask()
+        self._context_phrases = [
+            (wrong_phrase.lower(), correct_phrase)
+            for wrong_phrase, correct_phrase in self.context_errors.items()
+        ]
+
+        # Автомат Ахо-Корасик: все контекстные фразы ищутся за один проход
+        try:
+            import ahocorasick
+            self._ctx_automaton = ahocorasick.Automaton()
+            for wrong_phrase, correct_phrase in self.context_errors.items():
+                self._ctx_automaton.add_word(wrong_phrase.lower(), (len(wrong_phrase), correct_phrase))
+            self._ctx_automaton.make_automaton()
+            logger.info("✓ pyahocorasick загружен")
+        except Exception as e:
+            logger.debug(f"pyahocorasick недоступен, используется поиск подстрок: {e}")
+            self._ctx_automaton = None
+
+    @property
+    def spell(self):
+        """
+        Спеллчекер SymSpell (симметричное удаление), загружается лениво.
+        Словарь общий для всех ErrorChecker процесса
+        """
+        if self._spell is None and self.has_spellchecker:
+            try:
+                self._spell = _get_spell(self.language, self.dictionary_path)
+                logger.info("✓ symspellpy загружен")
+            except Exception as e:
+                logger.warning(f"symspellpy ошибка: {e}")
+                self.has_spellchecker = False
+        return self._spell
+
+    @property
+    def lt(self):
+        """
+        LanguageTool для грамматики, загружается лениво.
+        Экземпляр общий для всех ErrorChecker процесса; при заданном
+        language_tool_server используется уже запущенный сервер LanguageTool
+        """
+        if self._lt is None and self.has_language_tool:
+            try:
+                self._lt = _get_language_tool(self.language, self.language_tool_server)
+                logger.info("✓ LanguageTool загружен")
+            except Exception as e:
+                logger.warning(f"LanguageTool ошибка: {e}")
+                self.has_language_tool = False
+        return self._lt
+
     def check_text(self, text: str, check_grammar: bool = True, check_ocr_errors: bool = True) -> Dict:
         """
-        Проверить текст на ошибки OCR и орфографию
+        Проверить текст на ошибки OCR и орфографию.
+        Повторная проверка того же текста берется из кэша
         """
-        logger.info(f"Проверка текста ({len(text)} символов)")
+        return self.check_texts([text], check_grammar, check_ocr_errors)[0]
 
-        errors = []
-        corrected_text = text
-
-        # 0. Проверка переносов слов (дефис + перевод строки)
-        hyphen_errors = self._fix_word_hyphenation(corrected_text)
-        errors.extend(hyphen_errors)
-        for error in hyphen_errors:
-            corrected_text = corrected_text.replace(error['original'], error['suggestion'])
-
-        # 1. Проверка OCR ошибок
-        if check_ocr_errors:
-            ocr_errors = self._check_ocr_errors(text)
-            errors.extend(ocr_errors)
-            for error in ocr_errors:
-                corrected_text = corrected_text.replace(error['original'], error['suggestion'])
-
-        # 2. Проверка контекстных ошибок
-        context_errors = self._check_context_errors(corrected_text)
-        errors.extend(context_errors)
-        for error in context_errors:
-            corrected_text = corrected_text.replace(error['original'], error['suggestion'])
-
-        # 3. Проверка грамматики с LanguageTool
+    def check_texts(self, texts: List[str], check_grammar: bool = True, check_ocr_errors: bool = True) -> List[Dict]:
+        """
+        Проверить несколько текстов (например, все страницы папки).
+        LanguageTool вызывается один раз на все тексты, которых нет в кэше.
+        Возвращаются копии: изменение результата не портит кэш
+        """
+        results = [None] * len(texts)
+        pending = OrderedDict()  # ключ кэша -> индексы текстов
+
+        for i, text in enumerate(texts):
+            key = (hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest(), check_grammar, check_ocr_errors)
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                self._result_cache.move_to_end(key)
+                logger.info(f"Проверка текста ({len(text)} символов): результат из кэша")
+                results[i] = copy.deepcopy(cached)
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            pending_texts = [texts[indices[0]] for indices in pending.values()]
+            checked, failed = self._check_texts(pending_texts, check_grammar, check_ocr_errors)
+
+            for (key, indices), result, grammar_failed in zip(pending.items(), checked, failed):
+                # Результат без грамматики из-за сбоя LanguageTool не кэшируем:
+                # следующая проверка того же текста повторит запрос
+                if not grammar_failed:
+                    self._result_cache[key] = result
+                    if len(self._result_cache) > RESULT_CACHE_SIZE:
+                        self._result_cache.popitem(last=False)
+                for i in indices:
+                    results[i] = copy.deepcopy(result)
+
+        return results
+
+    def _check_texts(self, texts: List[str], check_grammar: bool, check_ocr_errors: bool) -> List[Dict]:
+        """
+        Полный проход всех проверок без кэша.
+        Возвращает (результаты, флаги текстов, для которых не удалась проверка грамматики).
+        Проверки идут по очереди, каждая - по тексту с исправлениями предыдущих;
+        правки одной проверки применяются за один проход по тексту
+        """
+        passes = []
+
+        for text in texts:
+            logger.info(f"Проверка текста ({len(text)} символов)")
+
+            errors = []
+            corrected_text = text
+
+            # 0. Проверка переносов слов (дефис + перевод строки)
+            hyphen_errors = self._fix_word_hyphenation(corrected_text)
+            errors.extend(hyphen_errors)
+            corrected_text = self._apply_corrections(corrected_text, hyphen_errors)
+
+            # 1. Проверка OCR ошибок
+            if check_ocr_errors:
+                ocr_errors = self._check_ocr_errors(corrected_text)
+                errors.extend(ocr_errors)
+                corrected_text = self._apply_corrections(corrected_text, ocr_errors)
+
+            # 2. Проверка контекстных ошибок
+            context_errors = self._check_context_errors(corrected_text)
+            errors.extend(context_errors)
+            corrected_text = self._apply_corrections(corrected_text, context_errors)
+
+            passes.append((errors, corrected_text))
+
+        # 3. Проверка грамматики с LanguageTool - один запрос на все тексты
         if check_grammar and self.has_language_tool:
-            grammar_errors = self._check_grammar(corrected_text)
+            grammar_results, grammar_failed = self._check_grammar_batch(
+                [corrected_text for _, corrected_text in passes])
+        else:
+            grammar_results = [[] for _ in texts]
+            grammar_failed = [False] * len(texts)
+
+        results = []
+        for text, (errors, corrected_text), grammar_errors in zip(texts, passes, grammar_results):
             errors.extend(grammar_errors)
-            for error in grammar_errors:
-                if error.get('confidence', 0) > 0.8:
-                    corrected_text = corrected_text.replace(error['original'], error['suggestion'], 1)
+            corrected_text = self._apply_corrections(
+                corrected_text, [e for e in grammar_errors if e.get('confidence', 0) > 0.8])
+
+            # 4. Проверка орфографии
+            if check_grammar and self.has_spellchecker:
+                spell_errors = self._check_spelling(corrected_text)
+                errors.extend(spell_errors)
+                corrected_text = self._apply_corrections(corrected_text, spell_errors)
+
+            # Смещения относятся к промежуточным версиям текста - наружу их не отдаем
+            for error in errors:
+                del error['start'], error['end']
+
+            logger.info(f"Найдено ошибок: {len(errors)}")
+
+            results.append({
+                'success': True,
+                'original_text': text,
+                'corrected_text': corrected_text,
+                'errors': errors,
+                'error_count': len(errors),
+                'error_types': self._count_error_types(errors)
+            })
 
-        # 4. Проверка орфографии
-        if check_grammar and self.has_spellchecker:
-            spell_errors = self._check_spelling(corrected_text)
-            errors.extend(spell_errors)
-            for error in spell_errors:
-                corrected_text = corrected_text.replace(error['original'], error['suggestion'], 1)
+        return results, grammar_failed
+
+    @staticmethod
+    def _apply_corrections(text: str, errors: List[Dict]) -> str:
+        """
+        Применить исправления за один проход по тексту.
+        Исправления задаются смещениями 'start'/'end' в text; пересекающиеся
+        с уже принятым исправлением пропускаются.
+        """
+        if not errors:
+            return text
 
-        logger.info(f"Найдено ошибок: {len(errors)}")
+        parts = []
+        position = 0
+        for error in sorted(errors, key=lambda e: e['start']):
+            if error['start'] < position:
+                continue
+            parts.append(text[position:error['start']])
+            parts.append(error['suggestion'])
+            position = error['end']
+        parts.append(text[position:])
 
-        return {
-            'success': True,
-            'original_text': text,
-            'corrected_text': corrected_text,
-            'errors': errors,
-            'error_count': len(errors),
-            'error_types': self._count_error_types(errors)
-        }
+        return ''.join(parts)
 
     def _fix_word_hyphenation(self, text: str) -> List[Dict]:
         """
@@ -107,9 +320,7 @@ class ErrorChecker:
         errors = []
 
         # Ищем паттерн: буква + дефис + новая строка + буква
-        pattern = r'([а-яёА-ЯЁ])-\n([а-яёА-ЯЁ])'
-
-        matches = list(re.finditer(pattern, text))
+        matches = list(self._hyphen_re.finditer(text))
 
         for match in matches:
             original = match.group(0)  # полный матч (например: "р-\nн")
@@ -141,6 +352,8 @@ class ErrorChecker:
                 'original': full_original,
                 'suggestion': full_suggestion,
                 'text': original,
+                'start': word_start,
+                'end': word_end,
                 'description': f'Перенос слова: "{full_original}" → "{full_suggestion}"'
             })
 
@@ -149,103 +362,193 @@ class ErrorChecker:
     def _check_ocr_errors(self, text: str) -> List[Dict]:
         """Проверка типичных OCR ошибок"""
         errors = []
-        replacements = {
-            '0': 'О',
-            '1': 'І',
-            '3': 'З',
-            'l': 'і',
-        }
 
-        words = re.findall(r'\b\w+\b', text)
-        for word in words:
-            original_word = word
-            corrected_word = word
+        # Ищем только подозрительные символы и расширяем каждое попадание до слова
+        word_end = 0
+        for hit in self._ocr_find.finditer(text):
+            if hit.start() < word_end:
+                continue  # слово уже обработано
+
+            word_start = hit.start()
+            while word_start > 0 and self._is_word_char(text[word_start - 1]):
+                word_start -= 1
+            word_end = hit.end()
+            while word_end < len(text) and self._is_word_char(text[word_end]):
+                word_end += 1
 
-            for bad_char, good_char in replacements.items():
-                if bad_char in word:
-                    corrected_word = corrected_word.replace(bad_char, good_char)
+            original_word = text[word_start:word_end]
+            corrected_word = original_word.translate(self._ocr_table)
 
-            if corrected_word != original_word:
-                errors.append({
-                    'type': 'ocr_error',
-                    'original': original_word,
-                    'suggestion': corrected_word,
-                    'text': original_word,
-                    'description': f'Ошибка OCR: {original_word} → {corrected_word}'
-                })
+            errors.append({
+                'type': 'ocr_error',
+                'original': original_word,
+                'suggestion': corrected_word,
+                'text': original_word,
+                'start': word_start,
+                'end': word_end,
+                'description': f'Ошибка OCR: {original_word} → {corrected_word}'
+            })
 
         return errors
 
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        """Символ слова в смысле \\w"""
+        return char.isalnum() or char == '_'
+
     def _check_context_errors(self, text: str) -> List[Dict]:
         """Проверка контекстных ошибок"""
         errors = []
 
-        for wrong_phrase, correct_phrase in self.context_errors.items():
-            if wrong_phrase.lower() in text.lower():
-                pattern = re.compile(re.escape(wrong_phrase), re.IGNORECASE)
-                for match in pattern.finditer(text):
-                    errors.append({
-                        'type': 'context_error',
-                        'original': match.group(),
-                        'suggestion': correct_phrase,
-                        'text': match.group(),
-                        'description': f'Контекстная ошибка: "{match.group()}" → "{correct_phrase}"'
-                    })
+        # Смещения в text_lower должны совпадать с text; если lower() изменил длину
+        # (например, 'İ'), понижаем регистр посимвольно
+        text_lower = text.lower()
+        if len(text_lower) != len(text):
+            text_lower = ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+        matches = []
+
+        if self._ctx_automaton is not None:
+            for end, (length, correct_phrase) in self._ctx_automaton.iter(text_lower):
+                matches.append((end + 1 - length, end + 1, correct_phrase))
+        else:
+            for wrong_phrase, correct_phrase in self._context_phrases:
+                start = 0
+                while (index := text_lower.find(wrong_phrase, start)) != -1:
+                    start = index + len(wrong_phrase)
+                    matches.append((index, start, correct_phrase))
+
+        for start, end, correct_phrase in matches:
+            original = text[start:end]
+            errors.append({
+                'type': 'context_error',
+                'original': original,
+                'suggestion': correct_phrase,
+                'text': original,
+                'start': start,
+                'end': end,
+                'description': f'Контекстная ошибка: "{original}" → "{correct_phrase}"'
+            })
 
         return errors
 
     def _check_grammar(self, text: str) -> List[Dict]:
         """Проверка грамматики"""
-        if not self.has_language_tool or not self.lt:
-            return []
+        return self._check_grammar_batch([text])[0][0]
 
-        errors = []
+    def _check_grammar_batch(self, texts: List[str]) -> tuple:
+        """
+        Проверка грамматики нескольких текстов пакетными запросами к LanguageTool.
+        Тексты собираются в запросы не длиннее GRAMMAR_BATCH_MAX_CHARS символов
+        (длиннее - только одиночный текст).
+        Возвращает (ошибки по текстам, флаги текстов, запрос для которых не удался)
+        """
+        results = [[] for _ in texts]
+        failed = [False] * len(texts)
+        if not texts or not self.has_language_tool or self.lt is None:
+            return results, failed
+
+        batch = []
+        size = 0
+        for index, text in enumerate(texts):
+            if batch and size + len(text) > GRAMMAR_BATCH_MAX_CHARS:
+                self._check_grammar_request(texts, batch, results, failed)
+                batch = []
+                size = 0
+            batch.append(index)
+            size += len(text) + len(GRAMMAR_BATCH_DELIMITER)
+        if batch:
+            self._check_grammar_request(texts, batch, results, failed)
+
+        return results, failed
+
+    def _check_grammar_request(self, texts: List[str], indices: List[int], results: List[List[Dict]],
+                               failed: List[bool]):
+        """
+        Один запрос к LanguageTool для текстов с номерами indices; ошибки дописываются
+        в results, при неудачном запросе тексты отмечаются в failed.
+        Тексты склеиваются через разделитель, смещения ошибок пересчитываются
+        в каждый текст; ошибки, задевающие разделитель, отбрасываются
+        """
+        # Смещения начала каждого текста в склеенной строке
+        starts = []
+        position = 0
+        for index in indices:
+            starts.append(position)
+            position += len(texts[index]) + len(GRAMMAR_BATCH_DELIMITER)
 
         try:
-            matches = self.lt.check(text)
-
-            for match in matches:
-                if match.category in ['TYPOS', 'GRAMMAR']:
-                    if match.replacements:
-                        suggestion = match.replacements[0]
-                        original_text = text[match.offset:match.offset + match.length]
-
-                        errors.append({
-                            'type': 'grammar_error',
-                            'original': original_text,
-                            'suggestion': suggestion,
-                            'text': original_text,
-                            'description': f'Грамматика: "{original_text}" → "{suggestion}"',
-                            'confidence': 0.8
-                        })
+            matches = self.lt.check(GRAMMAR_BATCH_DELIMITER.join(texts[index] for index in indices))
         except Exception as e:
-            logger.debug(f"Ошибка при проверке грамматики: {e}")
+            logger.warning(f"Ошибка при проверке грамматики ({len(indices)} текстов): {e}")
+            for index in indices:
+                failed[index] = True
+            return
 
-        return errors
+        for match in matches:
+            if match.category in ['TYPOS', 'GRAMMAR']:
+                if match.replacements:
+                    position = bisect.bisect_right(starts, match.offset) - 1
+                    index = indices[position]
+                    text = texts[index]
+                    offset = match.offset - starts[position]
+                    if offset + match.length > len(text):
+                        continue
+
+                    suggestion = match.replacements[0]
+                    original_text = text[offset:offset + match.length]
+
+                    results[index].append({
+                        'type': 'grammar_error',
+                        'original': original_text,
+                        'suggestion': suggestion,
+                        'text': original_text,
+                        'start': offset,
+                        'end': offset + match.length,
+                        'description': f'Грамматика: "{original_text}" → "{suggestion}"',
+                        'confidence': 0.8
+                    })
 
     def _check_spelling(self, text: str) -> List[Dict]:
         """Проверка орфографии"""
-        if not self.has_spellchecker or not self.spell:
+        if not self.has_spellchecker or self.spell is None:
             return []
 
         errors = []
 
         try:
-            words = re.findall(r'\b[а-яёА-ЯЁ]+\b', text)
-            misspelled = self.spell.unknown(words)
-
-            for word in misspelled:
-                candidates = self.spell.candidates(word)
-
-                if candidates:
-                    suggestion = list(candidates)[0]
+            from symspellpy import Verbosity
+
+            # Все не кириллические символы заменяются пробелами, смещения сохраняются
+            masked = text.translate(self._non_cyr_table)
+            padded = ' ' + masked + ' '
+
+            # Позиция первого вхождения каждого слова (однобуквенные предлоги не проверяем)
+            spans = {}
+            for word in set(masked.split()):
+                if len(word) > 1:
+                    start = padded.find(' ' + word + ' ')
+                    key = word.lower()
+                    if key not in spans or start < spans[key][0]:
+                        spans[key] = (start, start + len(word))
+
+            for start, end in sorted(spans.values()):
+                suggestions = self.spell.lookup(text[start:end], Verbosity.CLOSEST,
+                                                max_edit_distance=2, transfer_casing=True)
+
+                # Расстояние 0 - слово есть в словаре
+                if suggestions and suggestions[0].distance > 0:
+                    original = text[start:end]
+                    suggestion = suggestions[0].term
                     errors.append({
                         'type': 'spelling_error',
-                        'original': word,
+                        'original': original,
                         'suggestion': suggestion,
-                        'text': word,
-                        'description': f'Орфография: {word} → {suggestion}',
-                        'candidates': list(candidates)[:3]
+                        'text': original,
+                        'start': start,
+                        'end': end,
+                        'description': f'Орфография: {original} → {suggestion}',
+                        'candidates': [item.term for item in suggestions[:3]]
                     })
         except Exception as e:
             logger.debug(f"Ошибка при проверке орфографии: {e}")
@@ -254,25 +557,24 @@ class ErrorChecker:
 
     def _count_error_types(self, errors: List[Dict]) -> Dict:
         """Подсчитать ошибки по типам"""
-        counts = {}
-        for error in errors:
-            error_type = error.get('type', 'unknown')
-            counts[error_type] = counts.get(error_type, 0) + 1
-        return counts
+        return dict(Counter(error.get('type', 'unknown') for error in errors))
 
     def get_stats(self, errors: List[Dict]) -> Dict:
         """Получить статистику ошибок"""
+        counts = self._count_error_types(errors)
         return {
             'total_errors': len(errors),
-            'error_types': self._count_error_types(errors),
+            'error_types': counts,
             'by_type': {
-                'ocr_errors': len([e for e in errors if e['type'] == 'ocr_error']),
-                'context_errors': len([e for e in errors if e['type'] == 'context_error']),
-                'grammar_errors': len([e for e in errors if e['type'] == 'grammar_error']),
-                'spelling_errors': len([e for e in errors if e['type'] == 'spelling_error']),
+                'ocr_errors': counts.get('ocr_error', 0),
+                'context_errors': counts.get('context_error', 0),
+                'grammar_errors': counts.get('grammar_error', 0),
+                'spelling_errors': counts.get('spelling_error', 0),
             }
         }
 
     def close(self):
         """Закрыть ресурсы"""
+        # Общий LanguageTool закрывается при выходе из процесса
+        self._lt = None
         logger.info("ErrorChecker закрыт")
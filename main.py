@@ -1,10 +1,13 @@
 import argparse
+import os
 import sys
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
-from config import DEFAULT_LANGUAGES, OUTPUT_DIR, SUPPORTED_FORMATS
-from ocr_engine import OCREngine
+from config import (CHECK_BATCH_CHARS, CHECK_BATCH_PAGES, DEFAULT_LANGUAGES, LANGUAGE_TOOL_SERVER, OUTPUT_DIR,
+                    SPELL_DICTIONARY_PATH, SUPPORTED_FORMATS)
+from ocr_engine import OCREngine, load_image
 from error_checker import ErrorChecker
 
 logging.basicConfig(
@@ -18,43 +21,126 @@ class OCRApplication:
         self.languages = languages or DEFAULT_LANGUAGES
         logger.info(f"Инициализация: языки={self.languages}")
         self.ocr = OCREngine(self.languages)
-        self.checker = ErrorChecker()
+        self.checker = ErrorChecker(dictionary_path=SPELL_DICTIONARY_PATH, language_tool_server=LANGUAGE_TOOL_SERVER)
     
-    def process_image(self, image_path: str, check_errors: bool = True, save_output: bool = False):
-        """Обработка одного изображения"""
-        result = self.ocr.recognize_text(image_path)
-        
+    def process_image(self, image_path: str, check_errors: bool = True, save_output: bool = False, output=None,
+                      image=None):
+        """
+        Обработка одного изображения.
+        output - уже открытый файл для результатов (пакетный режим),
+        image - заранее загруженное изображение
+        """
+        text, report = self.build_report(image_path, check_errors, image)
+        self.write_report(text, report, save_output, output)
+    
+    def build_report(self, image_path: str, check_errors: bool = True, image=None) -> tuple:
+        """Распознать изображение и собрать отчет: (текст или None при ошибке, отчет)"""
+        result = self.ocr.recognize_text(image_path, image)
+        return self.format_report(result, check_errors)
+    
+    def format_report(self, result: dict, check_errors: bool = True, errors: dict = None) -> tuple:
+        """
+        Проверить распознанный текст и собрать отчет: (текст или None при ошибке, отчет).
+        errors - уже готовый результат проверки (пакетный режим)
+        """
         if not result['success']:
-            print(f" Ошибка: {result['error']}")
-            return
+            return None, f" Ошибка: {result['error']}\n"
         
         text = result['full_text']
         stats = result['statistics']
         
-        print("\n" + "="*70)
-        print("  РАСПОЗНАННЫЙ ТЕКСТ:")
-        print("="*70)
-        print(text if text else "(пусто)")
-        print()
-        print("  СТАТИСТИКА:")
-        print(f"  Символов: {stats['characters']}")
-        print(f"  Слов: {stats['words']}")
+        lines = [
+            "",
+            "="*70,
+            "  РАСПОЗНАННЫЙ ТЕКСТ:",
+            "="*70,
+            text if text else "(пусто)",
+            "",
+            "  СТАТИСТИКА:",
+            f"  Символов: {stats['characters']}",
+            f"  Слов: {stats['words']}",
+        ]
         
         if check_errors:
-            errors = self.checker.check_text(text)
-            print(f"\n  НАЙДЕНО ОШИБОК: {errors['error_count']}")
+            if errors is None:
+                errors = self.checker.check_text(text)
+            lines.append(f"\n  НАЙДЕНО ОШИБОК: {errors['error_count']}")
             
             if errors['errors']:
                 for i, err in enumerate(errors['errors'], 1):
-                    print(f"  {i}. '{err['text']}' → '{err['suggestion']}'")
+                    lines.append(f"  {i}. '{err['text']}' → '{err['suggestion']}'")
         
-        print("="*70 + "\n")
+        lines.append("="*70 + "\n")
+        
+        return text, "\n".join(lines) + "\n"
+    
+    def write_report(self, text, report: str, save_output: bool = False, output=None):
+        """Сохранить текст и вывести отчет в stdout одной операцией"""
+        if text is not None:
+            if output is not None:
+                output.write(text + "\n\n")
+            elif save_output:
+                output_file = OUTPUT_DIR / "result.txt"
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                report += f" Результат сохранен: {output_file}\n\n"
         
-        if save_output:
-            output_file = OUTPUT_DIR / "result.txt"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(text)
-            print(f" Результат сохранен: {output_file}\n")
+        sys.stdout.write(report)
+
+
+# OCR-движок процесса-обработчика папки (создается один раз на процесс).
+# Обработчики только распознают текст: проверка ошибок и LanguageTool (JVM)
+# остаются в основном процессе, поэтому в обработчиках Java не запускается
+_worker_ocr = None
+
+
+def _init_worker(languages, jobs):
+    """Инициализация процесса-обработчика"""
+    global _worker_ocr
+    # Ядра делятся между процессами: меньше потоков на изображение,
+    # и каждый tesseract работает в один поток OpenMP
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    _worker_ocr = OCREngine(languages, max_workers=max(1, (os.cpu_count() or 1) // jobs))
+
+
+def _recognize_in_worker(image_path: str) -> dict:
+    """Распознавание изображения в процессе-обработчике"""
+    return _worker_ocr.recognize_text(image_path)
+
+
+def _recognize_folder(app: OCRApplication, image_files: list, jobs: int):
+    """Распознать изображения папки; результаты выдаются по мере готовности в исходном порядке"""
+    if jobs > 1 and len(image_files) > 1:
+        # Изображения независимы: распознаем в нескольких процессах
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(app.languages, jobs)) as executor:
+            yield from zip(image_files, executor.map(_recognize_in_worker, map(str, image_files)))
+    else:
+        # Следующее изображение читается с диска, пока распознается текущее
+        with ThreadPoolExecutor(max_workers=1) as loader:
+            next_image = loader.submit(load_image, image_files[0]) if image_files else None
+            for i, img_file in enumerate(image_files):
+                image = next_image.result()
+                if i + 1 < len(image_files):
+                    next_image = loader.submit(load_image, image_files[i + 1])
+                yield img_file, app.ocr.recognize_text(str(img_file), image)
+
+
+def _write_group(app: OCRApplication, group: list, check_errors: bool, output=None):
+    """Проверить ошибки группы страниц одним пакетом и вывести их отчеты"""
+    texts = [result['full_text'] for _, result in group if result['success']]
+    checks = iter(app.checker.check_texts(texts) if check_errors else [])
+    
+    for img_file, result in group:
+        print(f"\n Обработка: {img_file.name}")
+        errors = next(checks) if check_errors and result['success'] else None
+        text, report = app.format_report(result, check_errors, errors)
+        app.write_report(text, report, output=output)
+    
+    if output is not None:
+        output.flush()
+    sys.stdout.flush()
+
 
 def main():
     parser = argparse.ArgumentParser(description='OCR: Распознавание текста')
@@ -62,6 +148,8 @@ def main():
     parser.add_argument('-d', '--folder', help='Папка с изображениями')
     parser.add_argument('--no-check', action='store_true', help='Без проверки ошибок')
     parser.add_argument('-o', '--output', action='store_true', help='Сохранить результат')
+    parser.add_argument('-j', '--jobs', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='Число процессов для обработки папки')
     
     args = parser.parse_args()
     
@@ -76,10 +164,29 @@ def main():
             app.process_image(args.image, check_errors=not args.no_check, save_output=args.output)
         else:
             folder = Path(args.folder)
-            for img_file in folder.glob('*'):
-                if img_file.suffix.lower() in SUPPORTED_FORMATS:
-                    print(f"\n Обработка: {img_file.name}")
-                    app.process_image(str(img_file), check_errors=not args.no_check)
+            # Файл результатов открывается один раз на всю папку
+            output = open(OUTPUT_DIR / "result.txt", 'w', encoding='utf-8') if args.output else None
+            try:
+                image_files = [f for f in folder.glob('*') if f.suffix.lower() in SUPPORTED_FORMATS]
+                
+                # Ошибки проверяются группами страниц (один запрос к LanguageTool на группу);
+                # отчеты и текст группы выводятся сразу, как только она готова
+                check_errors = not args.no_check
+                group = []
+                group_chars = 0
+                for img_file, result in _recognize_folder(app, image_files, args.jobs):
+                    group.append((img_file, result))
+                    group_chars += len(result.get('full_text', ''))
+                    if len(group) >= CHECK_BATCH_PAGES or group_chars >= CHECK_BATCH_CHARS:
+                        _write_group(app, group, check_errors, output)
+                        group = []
+                        group_chars = 0
+                if group:
+                    _write_group(app, group, check_errors, output)
+            finally:
+                if output is not None:
+                    output.close()
+                    print(f" Результат сохранен: {output.name}\n")
     
     except KeyboardInterrupt:
         print("\n Прервано")
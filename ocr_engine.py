@@ -2,33 +2,91 @@ import cv2
 import numpy as np
 import pytesseract
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Ранний выход: если быстрые версии (исходная и CLAHE) дают уверенный и достаточно
+# длинный текст, остальные версии (включая дорогой денойзинг) не строятся
+EARLY_EXIT_CONFIDENCE = 85
+EARLY_EXIT_MIN_CHARS = 50
+
+# Порог дисперсии лапласиана: ниже него изображение считается чистым и денойзинг пропускается
+DENOISE_NOISE_THRESHOLD = 100
+
+# Сколько результатов Tesseract хранить в кэше (ключ - хэш содержимого изображения)
+OCR_CACHE_SIZE = 64
+
+def load_image(image_path: str):
+    """
+    Прочитать изображение (BGR) или вернуть None, если файл не читается.
+    imdecode вместо imread: cv2.imread не открывает пути с кириллицей в Windows
+    """
+    try:
+        return cv2.imdecode(np.fromfile(str(image_path), dtype=np.uint8), cv2.IMREAD_COLOR)
+    except (OSError, ValueError, cv2.error):
+        return None
+
 class OCREngine:
-    def __init__(self, languages=None):
+    def __init__(self, languages=None, max_workers=None):
         self.languages = languages or ['ru', 'en']
+        # Потоков на одно изображение (предобработка и процессы tesseract);
+        # меньше числа ядер, если изображения уже обрабатываются в нескольких процессах
+        self.max_workers = max_workers or os.cpu_count() or 1
+        if self.max_workers > 1:
+            # Версии распознаются несколькими процессами tesseract одновременно;
+            # каждый в один поток OpenMP, иначе ядра перегружаются.
+            # pytesseract передает tesseract окружение процесса целиком
+            os.environ.setdefault('OMP_THREAD_LIMIT', '1')
         logger.info(f"OCR Engine инициализирован: {self.languages}")
+        
+        # LRU-кэш результатов Tesseract; версии распознаются из нескольких потоков
+        self._ocr_cache = OrderedDict()
+        self._ocr_cache_lock = threading.Lock()
+        
+        # Объекты предобработки создаются один раз и переиспользуются для всех изображений
+        self._clahe_filter = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
+        self._morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2,2))
+        self._sharp_kernel = np.array([[-1, -1, -1],
+                                       [-1, 9, -1],
+                                       [-1, -1, -1]], dtype=np.float32)
     
-    def recognize_text(self, image_path: str) -> dict:
-        """Распознавание текста"""
+    def recognize_text(self, image_path: str, image: np.ndarray = None) -> dict:
+        """
+        Распознавание текста.
+        image - уже загруженное изображение (например, заранее прочитанное
+        отдельным потоком); если не передано, читается из image_path
+        """
         try:
             image_path = Path(image_path)
-            if not image_path.exists():
-                return {'success': False, 'error': 'Файл не найден'}
+            if image is None:
+                if not image_path.exists():
+                    return {'success': False, 'error': 'Файл не найден'}
+                image = load_image(image_path)
             
             logger.info(f"Обработка: {image_path}")
             
-            # Создаем несколько версий изображения
-            images = self._preprocess_image(str(image_path))
-            
-            # Распознаем текст из лучшей версии
+            gray = self._to_gray(image) if image is not None else None
             best_text = ""
-            for processed_img in images:
-                text = self._recognize_with_tesseract(processed_img)
-                if len(text) > len(best_text):
-                    best_text = text
+            
+            if gray is not None:
+                # Быстрый проход: исходное изображение и CLAHE, с оценкой уверенности
+                quick_results = self._recognize_parallel([gray, self._clahe(gray)], self._recognize_with_confidence)
+                best_text, confidence = max(quick_results, key=lambda result: self._text_length(result[0]))
+                
+                if confidence > EARLY_EXIT_CONFIDENCE and self._text_length(best_text) > EARLY_EXIT_MIN_CHARS:
+                    logger.info(f"Уверенность {confidence:.1f}, остальные версии пропущены")
+                else:
+                    # Создаем остальные версии изображения и берем самый длинный текст
+                    images = self._preprocess_image(gray)
+                    texts = [text for text, _ in quick_results]
+                    texts += self._recognize_parallel(images, self._recognize_with_tesseract)
+                    best_text = max(texts, key=self._text_length)
             
             return {
                 'success': True,
@@ -42,50 +100,136 @@ class OCREngine:
             logger.error(f"Ошибка: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _preprocess_image(self, image_path: str) -> list:
-        """Предобработка изображения - 5 версий"""
-        img = cv2.imread(image_path)
-        if img is None:
-            return []
-        
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        versions = [gray]
-        
-        # Версия 2: CLAHE контраст
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
-        versions.append(enhanced)
+    @staticmethod
+    def _text_length(text: str) -> int:
+        """
+        Длина текста без учета пробельной разметки: тексты из image_to_data
+        и image_to_string (с переводами строк и \\x0c в конце) сравниваются одинаково
+        """
+        return len(' '.join(text.split()))
+    
+    @staticmethod
+    def _to_gray(image: np.ndarray) -> np.ndarray:
+        """Перевести изображение (серое, BGR или BGRA) в оттенки серого"""
+        if image.ndim == 2:
+            return image
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    def _preprocess_image(self, gray: np.ndarray) -> list:
+        """Предобработка изображения - версии 3-7, строятся параллельно"""
+        # OpenCV отпускает GIL внутри своих функций, поэтому потоки дают реальное ускорение
+        variants = (self._otsu, self._adaptive, self._morph, self._denoise, self._sharpen)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(variant, gray) for variant in variants]
+            versions = [future.result() for future in futures]
         
-        # Версия 3: Otsu бинаризация
+        # Денойзинг возвращает None для чистых изображений
+        return [version for version in versions if version is not None]
+    
+    def _clahe(self, gray: np.ndarray) -> np.ndarray:
+        """Версия 2: CLAHE контраст"""
+        return self._clahe_filter.apply(gray)
+    
+    @staticmethod
+    def _otsu(gray: np.ndarray) -> np.ndarray:
+        """Версия 3: Otsu бинаризация"""
         _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        versions.append(otsu)
+        return otsu
+    
+    @staticmethod
+    def _adaptive(gray: np.ndarray) -> np.ndarray:
+        """Версия 4: Адаптивная бинаризация"""
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    
+    def _morph(self, gray: np.ndarray) -> np.ndarray:
+        """Версия 5: Морфология"""
+        return cv2.morphologyEx(gray, cv2.MORPH_CLOSE, self._morph_kernel)
+    
+    @staticmethod
+    def _denoise(gray: np.ndarray):
+        """Версия 6: очистка шумов билатеральным фильтром (None для чистых изображений)"""
+        noise = cv2.Laplacian(gray, cv2.CV_64F).var()
+        if noise < DENOISE_NOISE_THRESHOLD:
+            return None
+        return cv2.bilateralFilter(gray, d=5, sigmaColor=50, sigmaSpace=50)
+    
+    def _sharpen(self, gray: np.ndarray) -> np.ndarray:
+        """Версия 7: Увеличение резкости"""
+        return cv2.filter2D(gray, -1, self._sharp_kernel)
+    
+    def _recognize_parallel(self, images: list, recognize) -> list:
+        """Распознать версии параллельно (каждый вызов - отдельный процесс tesseract)"""
+        with ThreadPoolExecutor(max_workers=max(1, min(len(images), self.max_workers))) as executor:
+            return list(executor.map(recognize, images))
+    
+    def _cache_key(self, kind: str, image: np.ndarray) -> tuple:
+        """Ключ кэша: вид распознавания, размер и хэш пикселей"""
+        digest = hashlib.blake2b(np.ascontiguousarray(image), digest_size=16).digest()
+        return kind, image.shape, digest
+    
+    def _cache_get(self, key: tuple):
+        with self._ocr_cache_lock:
+            value = self._ocr_cache.get(key)
+            if value is not None:
+                self._ocr_cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, key: tuple, value):
+        with self._ocr_cache_lock:
+            self._ocr_cache[key] = value
+            if len(self._ocr_cache) > OCR_CACHE_SIZE:
+                self._ocr_cache.popitem(last=False)
+    
+    def _recognize_with_confidence(self, image: np.ndarray) -> tuple:
+        """Распознавание Tesseract с средней уверенностью по словам (с кэшем)"""
+        key = self._cache_key('data', image)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
         
-        # Версия 4: Адаптивная бинаризация
-        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-        versions.append(adaptive)
+        try:
+            data = pytesseract.image_to_data(image, lang='rus+eng', output_type=pytesseract.Output.DICT)
+        except:
+            return "", 0.0
         
-        # Версия 5: Морфология
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2,2))
-        morph = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel)
-        versions.append(morph)
-
-        # Добавить версию 6: очистка шумов (денойзинг)
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 10, 21)
-        versions.append(denoised)
-
-        # Добавить версию 7: Увеличение резкости
-        kernel_sharp = np.array([[-1, -1, -1],
-                                 [-1, 9, -1],
-                                 [-1, -1, -1]])
-        sharpened = cv2.filter2D(gray, -1, kernel_sharp)
-        versions.append(sharpened)
+        # Собираем слова по строкам; conf = -1 у служебных элементов разметки
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            conf = float(data['conf'][i])
+            if conf < 0 or not word.strip():
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_key, []).append(word)
+            confidences.append(conf)
         
-        return versions
+        # Строки одного абзаца через перевод строки, абзацы - через пустую строку
+        parts = []
+        previous_par = None
+        for (block, par, _), words in lines.items():
+            if previous_par is not None:
+                parts.append('\n' if (block, par) == previous_par else '\n\n')
+            parts.append(' '.join(words))
+            previous_par = (block, par)
+        
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        result = ''.join(parts), confidence
+        self._cache_put(key, result)
+        return result
     
     def _recognize_with_tesseract(self, image: np.ndarray) -> str:
-        """Распознавание Tesseract"""
+        """Распознавание Tesseract (с кэшем)"""
+        key = self._cache_key('string', image)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
             text = pytesseract.image_to_string(image, lang='rus+eng')
-            return text
         except:
             return ""
+        
+        self._cache_put(key, text)
+        return text